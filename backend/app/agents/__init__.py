@@ -1,7 +1,6 @@
 """AI Agents for code review"""
 
-from .security_agent import SecurityAgent
-from .performance_agent import PerformanceAgent
-from .quality_agent import QualityAgent
+from .base_agent import BaseAgent
+from .registry import AGENT_CONFIGS, build_agent
 
-__all__ = ['SecurityAgent', 'PerformanceAgent', 'QualityAgent']
+__all__ = ['BaseAgent', 'AGENT_CONFIGS', 'build_agent']
@@ -1,76 +1,184 @@
 """Base agent class for code review"""
 
-from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable, AsyncIterator, Final
+import asyncio
 import time
 import logging
-from openai import AsyncOpenAI
-from anthropic import AsyncAnthropic
-import google.generativeai as genai
+import orjson
+from pydantic import TypeAdapter
+from app.agents import clients
+from app.agents.batch import batch_processor
+from app.agents.cache import analysis_cache
 from app.config import settings
 from app.models import ReviewIssue, AgentResult, AgentStatus, AgentType
 
 logger = logging.getLogger(__name__)
 
+# Validates the whole issues list in one pydantic-core call
+_ISSUES_ADAPTER = TypeAdapter(List[ReviewIssue])
 
-class BaseAgent(ABC):
-    """Base class for all review agents"""
+# Same for every agent and every review
+_OUTPUT_SPEC: Final[str] = """
+
+**Output Format (JSON):**
+{
+  "issues": [
+    {
+      "severity": "critical|high|medium|low",
+      "title": "Brief title",
+      "description": "Detailed description",
+      "line_number": 10,
+      "category": "Category name",
+      "suggestion": "How to fix"
+    }
+  ]
+}
+
+Please analyze the code and return issues in the JSON format above.
+"""
+
+
+class _JsonObjectScanner:
+    """
+    Incremental brace-depth tracker for the first balanced {...} in a stream
+    Braces inside JSON strings are ignored
+    """
     
-    def __init__(self, agent_type: AgentType):
-        self.agent_type = agent_type
-        self.fork_id: Optional[str] = None
-        
-        # Initialize AI clients
-        self.openai_client = None
-        self.anthropic_client = None
-        self.gemini_model = None
-        
-        if settings.openai_api_key:
-            self.openai_client = AsyncOpenAI(api_key=settings.openai_api_key)
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.complete = False
+    
+    def feed(self, chunk: str) -> int:
+        """
+        Consume the next chunk of text
+        Returns the index in chunk just past the closing brace once the
+        first object is complete, otherwise -1
+        """
+        if self.complete:
+            return -1
         
-        if settings.anthropic_api_key:
-            self.anthropic_client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+        for i, char in enumerate(chunk):
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif self.depth == 0:
+                # Skip prose or code fences before the object starts
+                if char == '{':
+                    self.depth = 1
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                self.depth += 1
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    self.complete = True
+                    return i + 1
         
-        if settings.gemini_api_key:
-            genai.configure(api_key=settings.gemini_api_key)
-            self.gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+        return -1
+
+
+def _issues_payload(candidate: str) -> Optional[Dict]:
+    """Decode candidate if it is a JSON object with an "issues" key"""
+    try:
+        data = orjson.loads(candidate)
+    except orjson.JSONDecodeError:
+        return None
+    
+    if isinstance(data, dict) and 'issues' in data:
+        return data
+    return None
+
+
+def _find_issues_object(text: str) -> Optional[Dict]:
+    """
+    Return the first balanced {...} in text that decodes to an object
+    with an "issues" key, or None. Dict literals or placeholders in
+    prose before the result are skipped.
+    """
+    start = text.find('{')
+    while start != -1:
+        end = _JsonObjectScanner().feed(text[start:])
+        if end != -1:
+            data = _issues_payload(text[start:start + end])
+            if data is not None:
+                return data
+        start = text.find('{', start + 1)
     
-    @abstractmethod
-    def get_system_prompt(self) -> str:
-        """Return agent-specific system prompt"""
-        pass
+    return None
+
+
+class BaseAgent:
+    """
+    Review agent driven by its system prompt and focus areas
+    See app.agents.registry for the configured agents
+    """
     
-    @abstractmethod
-    def get_focus_areas(self) -> List[str]:
-        """Return areas this agent focuses on"""
-        pass
+    def __init__(
+        self,
+        agent_type: AgentType,
+        system_prompt: str,
+        focus_areas: List[str]
+    ):
+        self.agent_type = agent_type
+        self.focus_areas = focus_areas
+        
+        # System prompt and focus areas never change per agent, build once
+        self._system_prompt = system_prompt
+        self._focus_block = "\n".join(f"- {area}" for area in focus_areas)
+        self._prompt_prefix = (
+            f"{self._system_prompt}\n\n**Focus Areas:**\n{self._focus_block}\n"
+        )
     
     async def analyze_code(
         self, 
         code: str, 
         language: str,
-        similar_patterns: Optional[List[Dict]] = None
+        similar_patterns: Optional[List[Dict]] = None,
+        fork_id: Optional[str] = None
     ) -> AgentResult:
         """
         Main analysis method
         Returns AgentResult with issues found
+        
+        Agents are shared across reviews, so per-review state such as
+        the DB fork ID is passed in rather than stored on the instance.
         """
         start_time = time.time()
         
         try:
             logger.info(f"🤖 {self.agent_type.value} agent starting analysis...")
             
-            # Build prompt with context
-            prompt = self._build_prompt(code, language, similar_patterns)
-            
-            # Call AI model
-            analysis = await self._call_ai_model(prompt)
-            
-            # Parse issues
-            issues = self._parse_issues(analysis)
+            cache_key = analysis_cache.make_key(
+                self.agent_type.value, code, language, similar_patterns
+            )
+            cached = await analysis_cache.get(cache_key)
             
-            # Generate summary
-            summary = self._generate_summary(issues)
+            if cached:
+                logger.info(f"♻️ {self.agent_type.value} cache hit")
+                issues, summary = cached
+            else:
+                # Build prompt with context
+                prompt = self._build_prompt(code, language, similar_patterns)
+                
+                # Call AI model
+                analysis = await self._call_ai_model(prompt)
+                
+                # Parse issues
+                issues, parsed = self._parse_issues(analysis)
+                
+                # Generate summary
+                summary = self._generate_summary(issues)
+                
+                # A malformed reply must not be served to later retries
+                if parsed:
+                    await analysis_cache.set(cache_key, issues, summary)
             
             execution_time = time.time() - start_time
             
@@ -85,7 +193,7 @@ class BaseAgent(ABC):
                 issues=issues,
                 summary=summary,
                 execution_time=execution_time,
-                fork_id=self.fork_id
+                fork_id=fork_id
             )
             
         except Exception as e:
@@ -98,6 +206,7 @@ class BaseAgent(ABC):
                 issues=[],
                 summary=f"Analysis failed: {str(e)}",
                 execution_time=execution_time,
+                fork_id=fork_id,
                 error=str(e)
             )
     
@@ -109,108 +218,193 @@ class BaseAgent(ABC):
     ) -> str:
         """Build comprehensive prompt for AI"""
         
-        prompt = f"""{self.get_system_prompt()}
-
+        # Constant per agent first, so the prompt shares a stable prefix
+        parts: List[str] = [
+            self._prompt_prefix,
+            f"""
 **Code to Review:**
 Language: {language}
 ```{language}
 {code}
 ```
-
-**Focus Areas:**
-{chr(10).join(f"- {area}" for area in self.get_focus_areas())}
 """
+        ]
         
         if similar_patterns:
-            prompt += "\n**Similar Code Patterns Found (via Hybrid Search):**\n"
+            parts.append("\n**Similar Code Patterns Found (via Hybrid Search):**\n")
             for i, pattern in enumerate(similar_patterns[:3], 1):
-                prompt += f"\n{i}. {pattern.get('pattern_name', 'Unknown')}\n"
-                prompt += f"   Similarity: {pattern.get('similarity', 0):.2%}\n"
+                parts.append(f"\n{i}. {pattern.get('pattern_name', 'Unknown')}\n")
+                # Text-only matches have no vector similarity to report
+                if pattern.get('similarity') is not None:
+                    parts.append(f"   Similarity: {pattern['similarity']:.2%}\n")
                 if pattern.get('description'):
-                    prompt += f"   Context: {pattern['description']}\n"
+                    parts.append(f"   Context: {pattern['description']}\n")
         
-        prompt += """
-
-**Output Format (JSON):**
-{
-  "issues": [
-    {
-      "severity": "critical|high|medium|low",
-      "title": "Brief title",
-      "description": "Detailed description",
-      "line_number": 10,
-      "category": "Category name",
-      "suggestion": "How to fix"
-    }
-  ]
-}
-
-Please analyze the code and return issues in the JSON format above.
-"""
+        parts.append(_OUTPUT_SPEC)
         
-        return prompt
+        return "".join(parts)
     
     async def _call_ai_model(self, prompt: str) -> str:
+        """Call AI model, via the OpenAI batch queue when enabled"""
+        if settings.openai_batch_enabled and clients.openai_client:
+            return await batch_processor.submit(prompt, self._call_providers)
+        
+        return await self._call_providers(prompt)
+    
+    def _available_providers(self) -> List[Tuple[str, Callable[[str], Awaitable[str]]]]:
+        """Configured providers in fallback order"""
+        providers = []
+        
+        # Gemini first (you have the API key!), then OpenAI, then Anthropic
+        if clients.gemini_model:
+            providers.append(("Gemini", self._call_gemini))
+        if clients.openai_client:
+            providers.append(("OpenAI", self._call_openai))
+        if clients.anthropic_client:
+            providers.append(("Anthropic", self._call_anthropic))
+        
+        return providers
+    
+    async def _call_providers(self, prompt: str) -> str:
         """Call AI model (Gemini, OpenAI, or Anthropic)"""
+        providers = self._available_providers()
+        if not providers:
+            raise Exception("No AI provider available")
         
-        # Try Gemini first (you have the API key!)
-        if self.gemini_model:
-            try:
-                response = await self.gemini_model.generate_content_async(prompt)
-                return response.text
-                
-            except Exception as e:
-                logger.warning(f"Gemini call failed: {e}")
+        if settings.race_providers and len(providers) > 1:
+            return await self._race_providers(prompt, providers)
         
-        # Try OpenAI second
-        if self.openai_client:
+        # Each attempt gets its own timeout, capped by what is left of
+        # the overall budget so a stalled provider can't eat it all
+        remaining = settings.llm_total_budget
+        last_error: Optional[Exception] = None
+        for name, call in providers:
+            if remaining <= 0:
+                logger.warning(f"LLM budget exhausted before trying {name}")
+                break
+            
+            timeout = min(settings.llm_per_call_timeout, remaining)
+            started = time.monotonic()
             try:
-                response = await self.openai_client.chat.completions.create(
-                    model="gpt-4o-mini",  # Fast and cost-effective
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=2000
-                )
-                return response.choices[0].message.content
-                
+                return await asyncio.wait_for(call(prompt), timeout=timeout)
+            except asyncio.TimeoutError as e:
+                logger.warning(f"{name} call timed out after {timeout:.1f}s")
+                last_error = e
             except Exception as e:
-                logger.warning(f"OpenAI call failed: {e}")
+                logger.warning(f"{name} call failed: {e}")
+                last_error = e
+            
+            remaining -= time.monotonic() - started
         
-        # Fallback to Anthropic
-        if self.anthropic_client:
-            try:
-                response = await self.anthropic_client.messages.create(
-                    model="claude-3-haiku-20240307",  # Fast and affordable
-                    max_tokens=2000,
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ]
+        raise last_error
+    
+    async def _race_providers(
+        self,
+        prompt: str,
+        providers: List[Tuple[str, Callable[[str], Awaitable[str]]]]
+    ) -> str:
+        """Call all providers at once and return the first success"""
+        timeout = min(settings.llm_per_call_timeout, settings.llm_total_budget)
+        tasks = {
+            asyncio.create_task(asyncio.wait_for(call(prompt), timeout=timeout)): name
+            for name, call in providers
+        }
+        pending = set(tasks)
+        last_error: Optional[Exception] = None
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
                 )
-                return response.content[0].text
-                
-            except Exception as e:
-                logger.error(f"Anthropic call failed: {e}")
-                raise
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        logger.info(f"🏁 {tasks[task]} won the provider race")
+                        return task.result()
+                    logger.warning(f"{tasks[task]} call failed: {error}")
+                    last_error = error
+        finally:
+            for task in pending:
+                task.cancel()
         
-        raise Exception("No AI provider available")
+        raise last_error
     
-    def _parse_issues(self, analysis: str) -> List[ReviewIssue]:
-        """Parse AI response into ReviewIssue objects"""
-        import json
-        import re
+    async def _collect_stream(self, chunks: AsyncIterator[Optional[str]]) -> str:
+        """
+        Assemble streamed text, stopping as soon as a JSON object with
+        "issues" is complete so trailing prose never has to be waited for
+        """
+        parts: List[str] = []
+        scanner = _JsonObjectScanner()
         
+        async for text in chunks:
+            if not text:
+                continue
+            parts.append(text)
+            
+            # Objects without "issues" (e.g. {} in prose) don't end the stream
+            while text:
+                end = scanner.feed(text)
+                if end == -1:
+                    break
+                if _find_issues_object("".join(parts)) is not None:
+                    return "".join(parts)
+                scanner = _JsonObjectScanner()
+                text = text[end:]
+        
+        return "".join(parts)
+    
+    async def _call_gemini(self, prompt: str) -> str:
+        """Call Gemini (streaming)"""
+        response = await clients.gemini_model.generate_content_async(
+            prompt, stream=True
+        )
+        return await self._collect_stream(chunk.text async for chunk in response)
+    
+    async def _call_openai(self, prompt: str) -> str:
+        """Call OpenAI (streaming)"""
+        stream = await clients.openai_client.chat.completions.create(
+            model=clients.OPENAI_MODEL,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            max_tokens=2000,
+            stream=True
+        )
+        try:
+            return await self._collect_stream(
+                chunk.choices[0].delta.content
+                async for chunk in stream if chunk.choices
+            )
+        finally:
+            await stream.close()
+    
+    async def _call_anthropic(self, prompt: str) -> str:
+        """Call Anthropic (streaming)"""
+        async with clients.anthropic_client.messages.stream(
+            model=clients.ANTHROPIC_MODEL,
+            max_tokens=2000,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        ) as stream:
+            return await self._collect_stream(stream.text_stream)
+    
+    def _parse_issues(self, analysis: str) -> Tuple[List[ReviewIssue], bool]:
+        """
+        Parse AI response into ReviewIssue objects
+        The flag is False when parsing failed and the fallback issue was returned
+        """
         issues = []
         
         try:
             # Extract JSON from response
-            json_match = re.search(r'\{.*\}', analysis, re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group())
-                
-                for issue_data in data.get('issues', []):
-                    issues.append(ReviewIssue(**issue_data))
+            data = _find_issues_object(analysis)
+            if data is None:
+                raise ValueError('no JSON object with "issues" in response')
+            issues = _ISSUES_ADAPTER.validate_python(data['issues'])
             
         except Exception as e:
             logger.error(f"Failed to parse issues: {e}")
@@ -221,8 +415,9 @@ Please analyze the code and return issues in the JSON format above.
                 description=analysis[:500],
                 category="general"
             ))
+            return issues, False
         
-        return issues
+        return issues, True
     
     def _generate_summary(self, issues: List[ReviewIssue]) -> str:
         """Generate summary from issues"""
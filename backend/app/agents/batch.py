@@ -0,0 +1,183 @@
+"""Batch submission of prompts to the OpenAI Batch API"""
+
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import orjson
+from app.agents import clients
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+Fallback = Callable[[str], Awaitable[str]]
+
+# Terminal states reported by the Batch API
+_BATCH_DONE_STATES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchProcessor:
+    """
+    Collects prompts for a short linger window and submits them to
+    OpenAI as a single batch job. Flushes smaller than min_batch are
+    not worth the batch turnaround and go through each caller's
+    fallback instead.
+    """
+
+    def __init__(
+        self,
+        max_wait: float = 2.0,
+        max_batch: int = 64,
+        min_batch: int = 8,
+        poll_interval: float = 10.0
+    ):
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.min_batch = min_batch
+        self.poll_interval = poll_interval
+        self._queue: "asyncio.Queue[Tuple[str, Fallback, asyncio.Future]]" = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def submit(self, prompt: str, fallback: Fallback) -> str:
+        """Queue a prompt and wait for its completion text"""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._collect())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, fallback, future))
+        return await future
+
+    async def close(self):
+        """Stop collecting and cancel in-flight batches"""
+        tasks = list(self._inflight)
+        if self._worker:
+            tasks.append(self._worker)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker = None
+
+    def _spawn(self, coro: Awaitable):
+        """Run coro in the background, keeping a reference until done"""
+        task = asyncio.create_task(coro)
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _collect(self):
+        """Group queued prompts into batches of up to max_batch"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(pending) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(
+                        await asyncio.wait_for(self._queue.get(), remaining)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            if len(pending) < self.min_batch:
+                for prompt, fallback, future in pending:
+                    self._spawn(self._resolve(future, fallback(prompt)))
+            else:
+                self._spawn(self._flush(pending))
+
+    @staticmethod
+    async def _resolve(future: asyncio.Future, coro: Awaitable[str]):
+        """Settle future with the outcome of coro"""
+        try:
+            result = await coro
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    async def _flush(self, pending: List[Tuple[str, Fallback, asyncio.Future]]):
+        """Submit one batch job and dispatch results to waiting callers"""
+        logger.info(f"📦 Submitting batch of {len(pending)} prompts")
+
+        try:
+            outputs = await self._run_batch([prompt for prompt, _, _ in pending])
+        except Exception as e:
+            logger.error(f"Batch submission failed: {e}")
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for i, (_, _, future) in enumerate(pending):
+            if future.done():
+                continue
+            text = outputs.get(str(i))
+            if text is None:
+                future.set_exception(Exception(f"No batch output for request {i}"))
+            else:
+                future.set_result(text)
+
+    async def _run_batch(self, prompts: List[str]) -> Dict[str, str]:
+        """Upload prompts as JSONL, poll the batch and return custom_id -> text"""
+        client = clients.openai_client
+
+        lines = [
+            orjson.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": clients.OPENAI_MODEL,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": 0.3,
+                    "max_tokens": 2000
+                }
+            })
+            for i, prompt in enumerate(prompts)
+        ]
+
+        batch_file = await client.files.create(
+            file=("batch.jsonl", b"\n".join(lines)),
+            purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+
+        while batch.status not in _BATCH_DONE_STATES:
+            await asyncio.sleep(self.poll_interval)
+            batch = await client.batches.retrieve(batch.id)
+
+        if batch.status != "completed" or not batch.output_file_id:
+            raise Exception(f"Batch {batch.id} ended with status {batch.status}")
+
+        content = await client.files.content(batch.output_file_id)
+
+        outputs = {}
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                body = response["body"]
+                outputs[record["custom_id"]] = body["choices"][0]["message"]["content"]
+
+        return outputs
+
+
+# Global batch processor
+batch_processor = BatchProcessor(
+    max_wait=settings.batch_max_wait,
+    max_batch=settings.batch_max_size,
+    min_batch=settings.batch_min_size,
+    poll_interval=settings.batch_poll_interval
+)
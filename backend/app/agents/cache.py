@@ -0,0 +1,51 @@
+"""In-memory cache for agent analysis results"""
+
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+import asyncio
+import hashlib
+from app.config import settings
+from app.models import ReviewIssue
+
+
+class AnalysisCache:
+    """Bounded LRU cache of parsed issues and summary per analysis"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[List[ReviewIssue], str]]" = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def make_key(
+        agent_type: str,
+        code: str,
+        language: str,
+        similar_patterns: Optional[List[Dict]] = None
+    ) -> str:
+        """Hash everything that ends up in the prompt"""
+        pattern_names = sorted(
+            str(p.get('pattern_name', '')) for p in similar_patterns or []
+        )
+        raw = f"{agent_type}|{language}|{','.join(pattern_names)}|{code}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[Tuple[List[ReviewIssue], str]]:
+        """Return cached (issues, summary) and mark as recently used"""
+        async with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    async def set(self, key: str, issues: List[ReviewIssue], summary: str):
+        """Store (issues, summary), evicting the least recently used entry"""
+        async with self._lock:
+            self._entries[key] = (list(issues), summary)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Global cache instance
+analysis_cache = AnalysisCache(max_entries=settings.analysis_cache_size)
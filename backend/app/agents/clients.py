@@ -0,0 +1,64 @@
+"""Shared AI SDK clients for all agents"""
+
+from typing import Optional
+import logging
+import httpx
+from openai import AsyncOpenAI
+from anthropic import AsyncAnthropic
+import google.generativeai as genai
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Model names shared by direct and batch calls
+GEMINI_MODEL = "gemini-2.0-flash"
+OPENAI_MODEL = "gpt-4o-mini"  # Fast and cost-effective
+ANTHROPIC_MODEL = "claude-3-haiku-20240307"  # Fast and affordable
+EMBEDDING_MODEL = "text-embedding-3-small"  # 1536 dims, matches vector(1536)
+
+
+def _http_client() -> httpx.AsyncClient:
+    """HTTP/2 transport with limits sized for many concurrent agent calls"""
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections
+        ),
+        timeout=settings.llm_http_timeout
+    )
+
+
+# Built once per process so every agent and every review reuses the same
+# HTTP connection pools instead of paying a fresh TCP/TLS handshake.
+openai_client: Optional[AsyncOpenAI] = None
+anthropic_client: Optional[AsyncAnthropic] = None
+gemini_model: Optional[genai.GenerativeModel] = None
+
+if settings.openai_api_key:
+    openai_client = AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        http_client=_http_client()
+    )
+
+if settings.anthropic_api_key:
+    anthropic_client = AsyncAnthropic(
+        api_key=settings.anthropic_api_key,
+        http_client=_http_client()
+    )
+
+# Gemini's default gRPC transport already multiplexes over HTTP/2
+if settings.gemini_api_key:
+    genai.configure(api_key=settings.gemini_api_key)
+    gemini_model = genai.GenerativeModel(GEMINI_MODEL)
+
+
+async def close_clients():
+    """Close shared client connection pools"""
+    if openai_client:
+        await openai_client.close()
+
+    if anthropic_client:
+        await anthropic_client.close()
+
+    logger.info("AI clients closed")
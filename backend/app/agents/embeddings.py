@@ -0,0 +1,43 @@
+"""Code embeddings for hybrid search"""
+
+from typing import Optional
+import asyncio
+import base64
+import logging
+import numpy as np
+from app.agents import clients
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Stay well under the embedding model's token limit
+MAX_EMBEDDING_CHARS = 8000
+
+
+async def embed_code(code: str) -> Optional[np.ndarray]:
+    """
+    Embed code for vector search as a float32 array, which the pgvector
+    codec sends in binary. Returns None when no embedding provider is
+    configured or the call fails
+    """
+    if not clients.openai_client:
+        return None
+    
+    try:
+        # Search works without a vector, so don't let a slow call stall it
+        response = await asyncio.wait_for(
+            clients.openai_client.embeddings.create(
+                model=clients.EMBEDDING_MODEL,
+                input=code[:MAX_EMBEDDING_CHARS],
+                # Raw little-endian float32 bytes instead of a JSON float list
+                encoding_format="base64"
+            ),
+            timeout=settings.embedding_timeout
+        )
+        return np.frombuffer(
+            base64.b64decode(response.data[0].embedding), dtype=np.float32
+        )
+        
+    except Exception as e:
+        logger.warning(f"Embedding failed: {e}")
+        return None
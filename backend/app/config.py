@@ -14,6 +14,13 @@ class Settings(BaseSettings):
     tiger_db_name: str = "tsdb"
     tiger_db_user: str = "tsdbadmin"
     tiger_db_password: str
+    db_pool_min_size: int = 10
+    db_pool_max_size: int = 50
+    db_pool_max_queries: int = 50000
+    db_pool_max_inactive_lifetime: float = 300.0
+    db_statement_cache_size: int = 1024
+    # Monthly agent_results partitions to keep created ahead of time
+    agent_results_partitions_ahead: int = 2
     
     # AI Provider Keys
     openai_api_key: Optional[str] = None
@@ -26,6 +33,42 @@ class Settings(BaseSettings):
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     
+    # Upper bound on a whole review (seconds). Not applied when
+    # openai_batch_enabled is on; see batch_review_timeout
+    review_timeout: float = 30.0
+    
+    # Code embedding call for hybrid search (seconds); on timeout the
+    # search falls back to full-text ranking only
+    embedding_timeout: float = 5.0
+    
+    # Agent result cache (entries)
+    analysis_cache_size: int = 512
+    
+    # LLM HTTP transport (OpenAI / Anthropic)
+    llm_max_connections: int = 500
+    llm_max_keepalive_connections: int = 100
+    llm_http_timeout: float = 60.0
+    
+    # LLM call timeouts (seconds); the total budget across provider
+    # fallbacks stays under review_timeout
+    llm_per_call_timeout: float = 15.0
+    llm_total_budget: float = 25.0
+    
+    # Call all configured LLM providers at once, first success wins
+    # (lower latency, but multiplies API cost)
+    race_providers: bool = False
+    
+    # OpenAI Batch API (cheaper, but minutes-to-hours turnaround).
+    # Batched reviews can't finish within review_timeout, so while this
+    # is on reviews are bounded by batch_review_timeout instead, which
+    # covers the batch job's 24h completion window
+    openai_batch_enabled: bool = False
+    batch_review_timeout: float = 24 * 60 * 60
+    batch_max_wait: float = 2.0
+    batch_max_size: int = 64
+    batch_min_size: int = 8
+    batch_poll_interval: float = 10.0
+    
     # GitHub
     github_token: Optional[str] = None
     
@@ -1,9 +1,11 @@
 """FastAPI main application - AI Code Review Swarm"""
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
 import asyncio
+import orjson
 import uuid
 import logging
 from datetime import datetime
@@ -13,9 +15,13 @@ from app.models import (
     ReviewRequest, ReviewResponse, HealthResponse,
     AgentResult, CodeSubmission, AgentStatus
 )
-from app.agents import SecurityAgent, PerformanceAgent, QualityAgent
+from app.agents import AGENT_CONFIGS, build_agent
+from app.agents.batch import batch_processor
+from app.agents.clients import close_clients
+from app.agents.embeddings import embed_code
 from db.connection import db_connection
 from db.operations import code_review_db
+from db.notifications import review_notifier
 
 # Configure logging
 logging.basicConfig(
@@ -38,6 +44,15 @@ async def lifespan(app: FastAPI):
         # Setup database schema
         await code_review_db.setup_schema()
         
+        # Push review completion to /review/{id}/wait callers
+        await review_notifier.start()
+        
+        # Agents are stateless, so build them once and share across reviews
+        app.state.agents = {
+            agent_type.value: build_agent(agent_type)
+            for agent_type in AGENT_CONFIGS
+        }
+        
         logger.info("✅ Application started successfully!")
         
     except Exception as e:
@@ -48,6 +63,9 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("👋 Shutting down...")
+    await batch_processor.close()
+    await close_clients()
+    await review_notifier.stop()
     await db_connection.disconnect()
 
 
@@ -56,7 +74,8 @@ app = FastAPI(
     title="AI Code Review Swarm",
     description="Multi-agent code review system powered by Tiger Cloud Agentic Postgres",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -93,91 +112,86 @@ async def health_check():
     )
 
 
-async def run_agent_analysis(
-    agent,
-    code: str,
-    language: str,
+async def run_parallel_review(
     review_id: str,
+    submission_id: int,
+    submission: CodeSubmission,
+    agents_to_run: list,
     use_hybrid_search: bool = True
 ):
-    """Run single agent analysis"""
+    """Run all agents in parallel"""
+    
+    logger.info(f"🔄 Starting parallel review {review_id}")
+    
+    agent_map = app.state.agents
     
-    # Get similar patterns using hybrid search
+    # Every agent gets the same context, so embed and search once per review
     similar_patterns = []
     if use_hybrid_search:
+        # One embedding call per review enables the vector half of the
+        # search; without it only full-text ranking contributes
+        embedding = await embed_code(submission.code)
+        
         try:
             similar_patterns = await code_review_db.hybrid_search(
-                query_text=code[:500],  # First 500 chars for search
+                query_text=submission.code[:500],  # First 500 chars for text search
+                embedding=embedding,
                 limit=3
             )
         except Exception as e:
             logger.warning(f"Hybrid search failed: {e}")
     
-    # Run agent analysis
-    result = await agent.analyze_code(code, language, similar_patterns)
-    
-    # Save result to database
-    await code_review_db.save_agent_result(
-        review_id=review_id,
-        agent_type=result.agent_type.value,
-        status=result.status.value,
-        issues=[issue.model_dump() for issue in result.issues],
-        summary=result.summary,
-        execution_time=result.execution_time,
-        fork_id=result.fork_id,
-        error=result.error
-    )
-    
-    return result
-
-
-async def run_parallel_review(
-    review_id: str,
-    submission: CodeSubmission,
-    agents_to_run: list
-):
-    """Run all agents in parallel"""
-    
-    logger.info(f"🔄 Starting parallel review {review_id}")
-    
-    # Create agent instances
-    agent_map = {
-        "security": SecurityAgent(),
-        "performance": PerformanceAgent(),
-        "quality": QualityAgent()
-    }
-    
     # Run agents in parallel
     tasks = []
     for agent_type in agents_to_run:
         if agent_type.value in agent_map:
             agent = agent_map[agent_type.value]
-            task = run_agent_analysis(
-                agent,
+            task = agent.analyze_code(
                 submission.code,
                 submission.language,
-                review_id,
-                use_hybrid_search=True
+                similar_patterns
             )
             tasks.append(task)
     
-    # Wait for all agents to complete
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    # Batch jobs take minutes to hours; the interactive timeout would
+    # abort every batched review while the job keeps running
+    review_timeout = (
+        settings.batch_review_timeout if settings.openai_batch_enabled
+        else settings.review_timeout
+    )
+    
+    # Wait for all agents to complete; a failure or timeout cancels the rest
+    status = "completed"
+    handles = []
+    try:
+        async with asyncio.timeout(review_timeout):
+            async with asyncio.TaskGroup() as tg:
+                handles = [tg.create_task(task) for task in tasks]
+    except Exception as e:
+        logger.error(f"❌ Review {review_id} aborted: {e!r}")
+        status = "failed"
+    
+    # Keep whatever finished before an abort
+    agent_results = [
+        h.result() for h in handles
+        if h.done() and not h.cancelled() and h.exception() is None
+    ]
     
     # Count total issues
     total_issues = sum(
-        len(r.issues) for r in results 
-        if isinstance(r, AgentResult) and r.status == AgentStatus.COMPLETED
+        len(r.issues) for r in agent_results
+        if r.status == AgentStatus.COMPLETED
     )
     
-    # Update review status
-    await code_review_db.update_review_status(
+    # Save results and update review status in one transaction
+    await code_review_db.finalize_review(
         review_id=review_id,
-        status="completed",
-        total_issues=total_issues
+        results=agent_results,
+        total_issues=total_issues,
+        status=status
     )
     
-    logger.info(f"✅ Review {review_id} completed - {total_issues} issues found")
+    logger.info(f"✅ Review {review_id} {status} - {total_issues} issues found")
 
 
 @app.post("/review", response_model=ReviewResponse, tags=["Review"])
@@ -200,23 +214,23 @@ async def create_review(
         # Generate review ID
         review_id = f"review_{uuid.uuid4().hex[:12]}"
         
-        # Save submission to database
-        submission_id = await code_review_db.save_submission(
+        # Save submission and create review record together
+        submission_id = await code_review_db.create_submission_and_review(
             code=request.submission.code,
             language=request.submission.language,
+            review_id=review_id,
             filename=request.submission.filename,
             metadata=request.submission.metadata
         )
         
-        # Create review record
-        await code_review_db.create_review(submission_id, review_id)
-        
         # Start parallel review in background
         background_tasks.add_task(
             run_parallel_review,
             review_id,
+            submission_id,
             request.submission,
-            request.agents
+            request.agents,
+            request.use_hybrid_search
         )
         
         # Return immediate response
@@ -265,7 +279,7 @@ async def get_review(review_id: str):
                 review_data['completed_at'] - review_data['created_at']
             ).total_seconds()
         
-        return ReviewResponse(
+        response = ReviewResponse(
             review_id=review_id,
             status=review_data['status'],
             submission=submission,
@@ -276,6 +290,10 @@ async def get_review(review_id: str):
             total_time=total_time
         )
         
+        # Already validated above; dump once instead of letting FastAPI
+        # re-validate and re-serialize through response_model
+        return ORJSONResponse(response.model_dump(mode="json"))
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -283,23 +301,56 @@ async def get_review(review_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/review/{review_id}/wait", response_model=ReviewResponse, tags=["Review"])
+async def wait_for_review(
+    review_id: str,
+    timeout: float = Query(30.0, gt=0, le=120)
+):
+    """
+    Block until the review completes or fails (or timeout seconds pass),
+    then return its results
+    """
+    
+    async with review_notifier.subscribe(review_id) as done:
+        # Checked after subscribing so a completion in between isn't lost
+        status = await code_review_db.get_review_status(review_id)
+        
+        if status is None:
+            raise HTTPException(status_code=404, detail="Review not found")
+        
+        if status not in ("completed", "failed"):
+            try:
+                async with asyncio.timeout(timeout):
+                    await done.wait()
+            except TimeoutError:
+                pass
+    
+    return await get_review(review_id)
+
+
+@app.get("/review/{review_id}/results/stream", tags=["Review"])
+async def stream_review_results(review_id: str):
+    """
+    Stream agent results as newline-delimited JSON, one row at a time
+    """
+    
+    # Checked up front; once streaming starts the status is already 200
+    if await code_review_db.get_review_status(review_id) is None:
+        raise HTTPException(status_code=404, detail="Review not found")
+    
+    async def ndjson():
+        async for result in code_review_db.iter_agent_results(review_id):
+            yield orjson.dumps(result) + b"\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 @app.get("/stats", tags=["Stats"])
 async def get_stats():
     """Get system statistics"""
     
     try:
-        stats_query = """
-            SELECT 
-                COUNT(DISTINCT r.review_id) as total_reviews,
-                COUNT(DISTINCT cs.id) as total_submissions,
-                SUM(r.total_issues) as total_issues_found,
-                AVG(ar.execution_time) as avg_execution_time
-            FROM reviews r
-            JOIN code_submissions cs ON r.submission_id = cs.id
-            LEFT JOIN agent_results ar ON r.review_id = ar.review_id
-        """
-        
-        stats = await db_connection.execute_one(stats_query)
+        stats = await code_review_db.get_stats()
         
         return {
             "total_reviews": stats['total_reviews'] or 0,
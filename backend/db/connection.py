@@ -1,35 +1,89 @@
 """Tiger Cloud database connection management"""
 
 import asyncpg
-import psycopg
-from psycopg_pool import ConnectionPool
-from typing import Optional
+import orjson
+from pgvector.asyncpg import register_vector
+from typing import Any, Dict, Optional
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _encode_jsonb(value) -> bytes:
+    """jsonb binary format: version byte followed by JSON text"""
+    return b'\x01' + orjson.dumps(value)
+
+
+def _decode_jsonb(data: bytes):
+    return orjson.loads(data[1:])
+
+
+def _encode_json(value) -> str:
+    return orjson.dumps(value).decode()
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    """Per-connection setup: JSON/JSONB go through orjson, not str round-trips"""
+    await conn.set_type_codec(
+        'jsonb',
+        encoder=_encode_jsonb,
+        decoder=_decode_jsonb,
+        schema='pg_catalog',
+        format='binary'
+    )
+    await conn.set_type_codec(
+        'json',
+        encoder=_encode_json,
+        decoder=orjson.loads,
+        schema='pg_catalog',
+        format='text'
+    )
+    try:
+        # Embeddings travel as binary float arrays instead of text
+        await register_vector(conn)
+    except ValueError:
+        # Extension not created yet; setup_schema expires the pool after
+        pass
+
+
 class TigerConnection:
     """Manages connections to Tiger Cloud PostgreSQL"""
     
     def __init__(self):
-        self.pool: Optional[ConnectionPool] = None
         self._async_pool: Optional[asyncpg.Pool] = None
+        # Session settings sent at connect time; RESET ALL on pool release
+        # returns to these, so they hold for every query without a SET.
+        # hnsw.ef_search matches configure_hnsw_params for small tables and
+        # is retuned by setup_schema
+        self._server_settings: Dict[str, str] = {"hnsw.ef_search": "100"}
+    
+    def _connect_kwargs(self) -> Dict[str, Any]:
+        return dict(
+            host=settings.tiger_db_host,
+            port=settings.tiger_db_port,
+            database=settings.tiger_db_name,
+            user=settings.tiger_db_user,
+            password=settings.tiger_db_password,
+            server_settings=dict(self._server_settings)
+        )
     
     async def connect(self):
         """Initialize connection pool"""
         try:
-            # Async pool for high-performance operations
+            # Native asyncpg pool; every DB call stays on the event loop
             self._async_pool = await asyncpg.create_pool(
-                host=settings.tiger_db_host,
-                port=settings.tiger_db_port,
-                database=settings.tiger_db_name,
-                user=settings.tiger_db_user,
-                password=settings.tiger_db_password,
-                min_size=2,
-                max_size=10,
-                command_timeout=60
+                **self._connect_kwargs(),
+                min_size=settings.db_pool_min_size,
+                max_size=settings.db_pool_max_size,
+                max_queries=settings.db_pool_max_queries,
+                max_inactive_connection_lifetime=settings.db_pool_max_inactive_lifetime,
+                command_timeout=60,
+                # asyncpg prepares each query text once per connection and
+                # reuses the plan; keep hot statements cached indefinitely
+                statement_cache_size=settings.db_statement_cache_size,
+                max_cached_statement_lifetime=0,
+                init=_init_connection
             )
             
             logger.info("✅ Connected to Tiger Cloud successfully")
@@ -51,12 +105,35 @@ class TigerConnection:
             logger.error(f"❌ Failed to connect to Tiger Cloud: {e}")
             raise
     
+    async def connect_single(self) -> asyncpg.Connection:
+        """Open a dedicated, unpooled connection (e.g. for LISTEN)"""
+        return await asyncpg.connect(**self._connect_kwargs())
+    
     async def disconnect(self):
         """Close all connections"""
         if self._async_pool:
             await self._async_pool.close()
             logger.info("Disconnected from Tiger Cloud")
     
+    async def set_server_settings(self, values: Dict[str, str]):
+        """Change session settings for all pooled connections"""
+        if all(self._server_settings.get(k) == v for k, v in values.items()):
+            return
+        
+        self._server_settings.update(values)
+        if self._async_pool:
+            self._async_pool.set_connect_args(**self._connect_kwargs())
+            await self._async_pool.expire_connections()
+    
+    async def expire_connections(self):
+        """Replace pooled connections on next acquire so init runs again"""
+        if self._async_pool:
+            await self._async_pool.expire_connections()
+    
+    def acquire(self):
+        """Acquire a pooled connection for multi-statement work"""
+        return self._async_pool.acquire()
+    
     async def execute_query(self, query: str, *args):
         """Execute a query and return results"""
         async with self._async_pool.acquire() as conn:
@@ -72,6 +149,13 @@ class TigerConnection:
         async with self._async_pool.acquire() as conn:
             return await conn.execute(query, *args)
     
+    async def copy_records(self, table: str, records: list, columns: list):
+        """Bulk insert records using the binary COPY protocol"""
+        async with self._async_pool.acquire() as conn:
+            return await conn.copy_records_to_table(
+                table, records=records, columns=columns
+            )
+    
     async def test_connection(self) -> bool:
         """Test if connection is alive"""
         try:
@@ -0,0 +1,106 @@
+"""Review completion events via Postgres LISTEN/NOTIFY"""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+import asyncio
+import asyncpg
+import logging
+from db.connection import db_connection
+
+logger = logging.getLogger(__name__)
+
+# Channel the reviews status trigger notifies with the review_id
+REVIEW_DONE_CHANNEL = "review_done"
+
+
+class ReviewNotifier:
+    """
+    Holds one dedicated LISTEN connection and wakes the waiters of a
+    review when its completion notification arrives
+    """
+    
+    def __init__(self, reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0):
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._conn: Optional[asyncpg.Connection] = None
+        self._waiters: Dict[str, Set[asyncio.Event]] = {}
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closing = False
+    
+    async def start(self):
+        """Open the listener connection and subscribe to the channel"""
+        self._closing = False
+        await self._listen()
+        logger.info(f"👂 Listening on {REVIEW_DONE_CHANNEL}")
+    
+    async def stop(self):
+        """Close the listener connection"""
+        self._closing = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            await asyncio.gather(self._reconnect_task, return_exceptions=True)
+            self._reconnect_task = None
+        
+        if self._conn:
+            await self._conn.close()
+            self._conn = None
+    
+    async def _listen(self):
+        # Pooled connections get reset on release, which drops LISTEN
+        conn = await db_connection.connect_single()
+        conn.add_termination_listener(self._on_terminated)
+        await conn.add_listener(REVIEW_DONE_CHANNEL, self._on_notify)
+        self._conn = conn
+    
+    def _on_terminated(self, conn):
+        if self._closing or conn is not self._conn:
+            return
+        
+        logger.warning(f"⚠️ {REVIEW_DONE_CHANNEL} listener connection lost, reconnecting")
+        self._conn = None
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+    
+    async def _reconnect(self):
+        """Re-LISTEN with backoff, then wake every waiter to re-check status"""
+        delay = self.reconnect_delay
+        while not self._closing:
+            try:
+                await self._listen()
+            except Exception as e:
+                logger.warning(f"Listener reconnect failed: {e}; retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+            
+            logger.info(f"👂 Listening on {REVIEW_DONE_CHANNEL} again")
+            # Notifications sent while disconnected are lost
+            for waiters in self._waiters.values():
+                for event in waiters:
+                    event.set()
+            return
+    
+    def _on_notify(self, conn, pid, channel, review_id):
+        for event in self._waiters.get(review_id, ()):
+            event.set()
+    
+    @asynccontextmanager
+    async def subscribe(self, review_id: str) -> AsyncIterator[asyncio.Event]:
+        """
+        Yield an event set when review_id completes. Check the review's
+        status inside the block so a notification sent before subscribing
+        isn't missed.
+        """
+        event = asyncio.Event()
+        self._waiters.setdefault(review_id, set()).add(event)
+        try:
+            yield event
+        finally:
+            waiters = self._waiters[review_id]
+            waiters.discard(event)
+            if not waiters:
+                del self._waiters[review_id]
+
+
+# Global notifier instance
+review_notifier = ReviewNotifier()
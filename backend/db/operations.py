@@ -1,138 +1,675 @@
 """Database operations for code review system"""
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable, AsyncIterator
+import asyncpg
+import numpy as np
 from db.connection import db_connection
+from app.config import settings
+from app.models import AgentResult
 import logging
-import json
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Module-level so every call sends identical text and hits asyncpg's
+# per-connection prepared statement cache
+SAVE_SUBMISSION_QUERY = """
+    INSERT INTO code_submissions 
+    (code, language, filename, metadata, embedding)
+    VALUES ($1, $2, $3, $4, $5)
+    RETURNING id
+"""
+
+CREATE_SUBMISSION_AND_REVIEW_QUERY = """
+    WITH s AS (
+        INSERT INTO code_submissions 
+        (code, language, filename, metadata, embedding)
+        VALUES ($1, $2, $3, $4, $5)
+        RETURNING id
+    )
+    INSERT INTO reviews (submission_id, review_id, status)
+    SELECT id, $6, 'running' FROM s
+    RETURNING submission_id
+"""
+
+CREATE_REVIEW_QUERY = """
+    INSERT INTO reviews (submission_id, review_id, status)
+    VALUES ($1, $2, 'running')
+"""
+
+SAVE_AGENT_RESULT_QUERY = """
+    INSERT INTO agent_results 
+    (review_id, agent_type, status, issues, summary, execution_time, fork_id, error)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+"""
+
+UPDATE_REVIEW_STATUS_QUERY = """
+    UPDATE reviews 
+    SET status = $1, total_issues = $2, completed_at = NOW()
+    WHERE review_id = $3
+"""
+
+FINALIZE_REVIEW_QUERY = """
+    WITH inserted AS (
+        INSERT INTO agent_results 
+        (review_id, agent_type, status, issues, summary, execution_time, fork_id, error)
+        SELECT $1::text, r.*
+        FROM jsonb_to_recordset($2::jsonb) AS r(
+            agent_type text, status text, issues jsonb, summary text,
+            execution_time float8, fork_id text, error text
+        )
+    )
+    UPDATE reviews 
+    SET status = $3, total_issues = $4, completed_at = NOW()
+    WHERE review_id = $1
+"""
+
+# One row per agent result (or one with NULL agent columns if there are
+# none yet), so the review and its results come from the same snapshot
+GET_REVIEW_QUERY = """
+    SELECT
+        r.*,
+        cs.code, cs.language, cs.filename,
+        ar.agent_type, ar.status AS agent_status, ar.issues, ar.summary,
+        ar.execution_time, ar.fork_id, ar.error
+    FROM reviews r
+    JOIN code_submissions cs ON r.submission_id = cs.id
+    LEFT JOIN agent_results ar ON r.review_id = ar.review_id
+    WHERE r.review_id = $1
+"""
+
+# GET_REVIEW_QUERY columns that belong to the agent result, keyed by
+# the AgentResult field they map to
+_REVIEW_AGENT_COLUMNS = {
+    'agent_type': 'agent_type',
+    'status': 'agent_status',
+    'issues': 'issues',
+    'summary': 'summary',
+    'execution_time': 'execution_time',
+    'fork_id': 'fork_id',
+    'error': 'error'
+}
+
+GET_REVIEW_STATUS_QUERY = "SELECT status FROM reviews WHERE review_id = $1"
+
+GET_AGENT_RESULTS_QUERY = """
+    SELECT agent_type, status, issues, summary, execution_time, fork_id, error
+    FROM agent_results
+    WHERE review_id = $1
+"""
+
+# Reciprocal Rank Fusion of vector (HNSW) and full-text (GIN) candidates
+# in one statement. $1 is the unit-length query embedding, so negative
+# inner product (<#>) against embedding_norm is cosine similarity.
+# Text terms are OR-ed: a code excerpt almost never contains every token
+# of a stored snippet, so plainto_tsquery's AND would rarely match.
+HYBRID_SEARCH_QUERY = """
+    WITH v AS (
+        SELECT
+            id,
+            -(embedding_norm <#> $1::halfvec) AS similarity,
+            row_number() OVER (ORDER BY embedding_norm <#> $1::halfvec) AS rnk
+        FROM code_patterns
+        WHERE $1::halfvec IS NOT NULL AND embedding_norm IS NOT NULL
+        ORDER BY embedding_norm <#> $1::halfvec
+        LIMIT 50
+    ),
+    t AS (
+        SELECT id, row_number() OVER (ORDER BY ts_rank(tsv, q) DESC) AS rnk
+        FROM code_patterns,
+            replace(plainto_tsquery('simple', $2)::text, ' & ', ' | ')::tsquery q
+        WHERE tsv @@ q
+        ORDER BY ts_rank(tsv, q) DESC
+        LIMIT 50
+    )
+    SELECT 
+        cp.code_snippet,
+        cp.pattern_name,
+        cp.description,
+        v.similarity,  -- NULL for text-only matches
+        COALESCE(1.0 / (60 + v.rnk), 0) + COALESCE(1.0 / (60 + t.rnk), 0) AS score
+    FROM v
+    FULL JOIN t USING (id)
+    JOIN code_patterns cp USING (id)
+    ORDER BY score DESC
+    LIMIT $3
+"""
+
+# Key for pg_advisory_xact_lock that serializes schema migrations
+SCHEMA_LOCK_ID = 42
+
+# Errors with UndefinedTableError until the first migration has run.
+# $1 is how many months of agent_results partitions should exist ahead.
+SCHEMA_STATE_QUERY = """
+    SELECT
+        (SELECT MAX(version) FROM schema_migrations) AS version,
+        (SELECT GREATEST(reltuples, 0)::bigint FROM pg_class
+         WHERE oid = to_regclass('code_patterns')) AS pattern_count,
+        to_regclass(
+            'agent_results_' || to_char(LOCALTIMESTAMP + make_interval(months => $1), 'YYYY_MM')
+        ) IS NOT NULL AS partitions_ready
+"""
+
+ENSURE_PARTITIONS_QUERY = "SELECT ensure_agent_results_partitions(LOCALTIMESTAMP, $1)"
+
+STATS_QUERY = """
+    SELECT 
+        COUNT(DISTINCT r.review_id) as total_reviews,
+        COUNT(DISTINCT cs.id) as total_submissions,
+        SUM(r.total_issues) as total_issues_found,
+        AVG(ar.execution_time) as avg_execution_time
+    FROM reviews r
+    JOIN code_submissions cs ON r.submission_id = cs.id
+    LEFT JOIN agent_results ar ON r.review_id = ar.review_id
+"""
+
+PATTERN_COLUMNS = [
+    'pattern_name', 'code_snippet', 'description', 'category',
+    'language', 'embedding'
+]
+
+
+def _normalize(embedding: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """Scale an embedding to unit length for inner-product search"""
+    if embedding is None:
+        return None
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def configure_hnsw_params(vector_count: int) -> Dict[str, int]:
+    """
+    Pick HNSW build (m, ef_construction) and query (ef_search)
+    parameters for the number of indexed vectors
+    """
+    if vector_count < 1_000_000:
+        return {"m": 24, "ef_construction": 128, "ef_search": 100}
+    if vector_count < 10_000_000:
+        return {"m": 32, "ef_construction": 200, "ef_search": 200}
+    return {"m": 48, "ef_construction": 256, "ef_search": 400}
+
 
 class CodeReviewDB:
     """Database operations for code review"""
     
     @staticmethod
     async def setup_schema():
-        """Create tables and enable extensions"""
+        """Apply pending schema migrations"""
         try:
-            # Enable extensions
-            await db_connection.execute_write(
-                "CREATE EXTENSION IF NOT EXISTS vector;"
-            )
-            
-            logger.info("✅ Extensions enabled")
-            
-            # Create code_submissions table
-            await db_connection.execute_write("""
-                CREATE TABLE IF NOT EXISTS code_submissions (
-                    id SERIAL PRIMARY KEY,
-                    code TEXT NOT NULL,
-                    language VARCHAR(50) DEFAULT 'python',
-                    filename VARCHAR(255),
-                    repository_url TEXT,
-                    metadata JSONB,
-                    embedding vector(1536),
-                    created_at TIMESTAMP DEFAULT NOW()
-                );
-            """)
+            migrations = CodeReviewDB._schema_migrations()
+            latest = migrations[-1][0]
             
-            # Create reviews table
-            await db_connection.execute_write("""
-                CREATE TABLE IF NOT EXISTS reviews (
-                    id SERIAL PRIMARY KEY,
-                    submission_id INTEGER REFERENCES code_submissions(id),
-                    review_id VARCHAR(100) UNIQUE NOT NULL,
-                    status VARCHAR(50) DEFAULT 'pending',
-                    total_issues INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    completed_at TIMESTAMP
-                );
-            """)
+            # Fast path: an up-to-date database costs a single SELECT
+            state = await CodeReviewDB._schema_state()
+            if state is None or (state['version'] or 0) < latest:
+                await CodeReviewDB._apply_migrations(migrations)
+                # Connections opened before the vector extension existed
+                # have no pgvector codec; replace them
+                await db_connection.expire_connections()
+                state = await CodeReviewDB._schema_state()
             
-            # Create agent_results table
-            await db_connection.execute_write("""
-                CREATE TABLE IF NOT EXISTS agent_results (
-                    id SERIAL PRIMARY KEY,
-                    review_id VARCHAR(100) REFERENCES reviews(review_id),
-                    agent_type VARCHAR(50) NOT NULL,
-                    status VARCHAR(50) DEFAULT 'pending',
-                    issues JSONB,
-                    summary TEXT,
-                    execution_time FLOAT,
-                    fork_id VARCHAR(100),
-                    error TEXT,
-                    created_at TIMESTAMP DEFAULT NOW()
-                );
-            """)
-            
-            # Create code_patterns table for hybrid search
-            await db_connection.execute_write("""
-                CREATE TABLE IF NOT EXISTS code_patterns (
-                    id SERIAL PRIMARY KEY,
-                    pattern_name VARCHAR(255),
-                    code_snippet TEXT NOT NULL,
-                    description TEXT,
-                    category VARCHAR(100),
-                    language VARCHAR(50),
-                    embedding vector(1536),
-                    created_at TIMESTAMP DEFAULT NOW()
-                );
-            """)
+            if not state['partitions_ready']:
+                await CodeReviewDB.ensure_partitions()
             
-            # Create indexes
-            await db_connection.execute_write("""
-                CREATE INDEX IF NOT EXISTS idx_submissions_created 
-                ON code_submissions(created_at DESC);
-            """)
-            
-            await db_connection.execute_write("""
-                CREATE INDEX IF NOT EXISTS idx_reviews_status 
-                ON reviews(status);
-            """)
+            # Query-time HNSW recall/speed knob, set once per connection
+            params = configure_hnsw_params(state['pattern_count'] or 0)
+            await db_connection.set_server_settings(
+                {"hnsw.ef_search": str(params['ef_search'])}
+            )
             
-            logger.info("✅ Database schema created successfully")
+            logger.info(f"✅ Database schema at version {latest}")
             
         except Exception as e:
             logger.error(f"❌ Schema setup failed: {e}")
             raise
     
+    @staticmethod
+    def _schema_migrations() -> List[Tuple[int, Callable[[Any], Awaitable[None]]]]:
+        """Ordered (version, step) pairs; never renumber applied versions"""
+        return [
+            (1, CodeReviewDB._create_base_tables),
+            (2, CodeReviewDB._migrate_embeddings_to_halfvec),
+            (3, CodeReviewDB._add_pattern_text_search),
+            (4, CodeReviewDB._create_pattern_vector_index),
+            (5, CodeReviewDB._create_lookup_indexes),
+            (6, CodeReviewDB._add_normalized_embeddings),
+            (7, CodeReviewDB._partition_agent_results),
+            (8, CodeReviewDB._add_review_done_trigger),
+            (9, CodeReviewDB._slim_lookup_indexes),
+        ]
+    
+    @staticmethod
+    async def _schema_state() -> Optional[Dict]:
+        """Applied schema version and pattern count, or None before bootstrap"""
+        try:
+            result = await db_connection.execute_one(
+                SCHEMA_STATE_QUERY, settings.agent_results_partitions_ahead
+            )
+        except asyncpg.exceptions.UndefinedTableError:
+            return None
+        return dict(result)
+    
+    @staticmethod
+    async def _apply_migrations(migrations: List[Tuple[int, Callable[[Any], Awaitable[None]]]]):
+        """Run pending steps in one transaction under an advisory lock"""
+        async with db_connection.acquire() as conn:
+            async with conn.transaction():
+                # Concurrent workers queue here instead of racing on DDL
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK_ID)
+                await conn.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INTEGER PRIMARY KEY,
+                        applied_at TIMESTAMPTZ DEFAULT NOW()
+                    );
+                """)
+                applied = await conn.fetchval(
+                    "SELECT COALESCE(MAX(version), 0) FROM schema_migrations"
+                )
+                
+                for version, step in migrations:
+                    if version <= applied:
+                        continue
+                    await step(conn)
+                    await conn.execute(
+                        "INSERT INTO schema_migrations (version) VALUES ($1)",
+                        version
+                    )
+                    logger.info(f"✅ Applied schema migration {version}")
+    
+    @staticmethod
+    async def _create_base_tables(conn):
+        """Enable extensions and create the core tables"""
+        # Enable extensions
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        
+        # Create code_submissions table
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS code_submissions (
+                id SERIAL PRIMARY KEY,
+                code TEXT NOT NULL,
+                language VARCHAR(50) DEFAULT 'python',
+                filename VARCHAR(255),
+                repository_url TEXT,
+                metadata JSONB,
+                embedding halfvec(1536),
+                created_at TIMESTAMP DEFAULT NOW()
+            );
+        """)
+        
+        # Create reviews table
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS reviews (
+                id SERIAL PRIMARY KEY,
+                submission_id INTEGER REFERENCES code_submissions(id),
+                review_id VARCHAR(100) UNIQUE NOT NULL,
+                status VARCHAR(50) DEFAULT 'pending',
+                total_issues INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT NOW(),
+                completed_at TIMESTAMP
+            );
+        """)
+        
+        # Create agent_results table
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS agent_results (
+                id SERIAL PRIMARY KEY,
+                review_id VARCHAR(100) REFERENCES reviews(review_id),
+                agent_type VARCHAR(50) NOT NULL,
+                status VARCHAR(50) DEFAULT 'pending',
+                issues JSONB,
+                summary TEXT,
+                execution_time FLOAT,
+                fork_id VARCHAR(100),
+                error TEXT,
+                created_at TIMESTAMP DEFAULT NOW()
+            );
+        """)
+        
+        # Create code_patterns table for hybrid search
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS code_patterns (
+                id SERIAL PRIMARY KEY,
+                pattern_name VARCHAR(255),
+                code_snippet TEXT NOT NULL,
+                description TEXT,
+                category VARCHAR(100),
+                language VARCHAR(50),
+                embedding halfvec(1536),
+                created_at TIMESTAMP DEFAULT NOW()
+            );
+        """)
+        
+        # Create indexes
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_submissions_created 
+            ON code_submissions(created_at DESC);
+        """)
+        
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_reviews_status 
+            ON reviews(status);
+        """)
+    
+    @staticmethod
+    async def _migrate_embeddings_to_halfvec(conn):
+        """Convert embedding columns created as vector(1536) to halfvec(1536)"""
+        for table in ('code_submissions', 'code_patterns'):
+            column_type = await conn.fetchval("""
+                SELECT format_type(atttypid, atttypmod)
+                FROM pg_attribute
+                WHERE attrelid = $1::regclass AND attname = 'embedding'
+            """, table)
+            
+            if column_type != 'vector(1536)':
+                continue
+            
+            logger.info(f"Migrating {table}.embedding to halfvec(1536)")
+            # vector_cosine_ops can't index halfvec; rebuilt in a later step
+            if table == 'code_patterns':
+                await conn.execute(
+                    "DROP INDEX IF EXISTS idx_code_patterns_embedding_hnsw"
+                )
+            await conn.execute(f"""
+                ALTER TABLE {table}
+                ALTER COLUMN embedding TYPE halfvec(1536)
+                USING embedding::halfvec(1536)
+            """)
+    
+    @staticmethod
+    async def _add_pattern_text_search(conn):
+        """Full-text search column + GIN index for the text path"""
+        await conn.execute("""
+            ALTER TABLE code_patterns
+            ADD COLUMN IF NOT EXISTS tsv tsvector
+            GENERATED ALWAYS AS (to_tsvector('simple', code_snippet)) STORED;
+        """)
+        
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_code_patterns_tsv 
+            ON code_patterns USING GIN (tsv);
+        """)
+    
+    @staticmethod
+    async def _build_hnsw_index(conn, name: str, column: str, opclass: str):
+        """Build an HNSW index on code_patterns sized for the table"""
+        vector_count = await conn.fetchval("""
+            SELECT GREATEST(reltuples, 0)::bigint
+            FROM pg_class WHERE oid = 'code_patterns'::regclass
+        """)
+        params = configure_hnsw_params(vector_count)
+        
+        # Give the build enough memory and workers to finish quickly;
+        # SET LOCAL ends with the migration transaction
+        await conn.execute("SET LOCAL maintenance_work_mem = '2GB'")
+        await conn.execute("SET LOCAL max_parallel_maintenance_workers = 7")
+        await conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS {name}
+            ON code_patterns USING hnsw ({column} {opclass})
+            WITH (m = {params['m']}, ef_construction = {params['ef_construction']});
+        """)
+    
+    @staticmethod
+    async def _create_pattern_vector_index(conn):
+        """Build the HNSW index on code_patterns.embedding"""
+        await CodeReviewDB._build_hnsw_index(
+            conn, 'idx_code_patterns_embedding_hnsw', 'embedding', 'halfvec_cosine_ops'
+        )
+    
+    @staticmethod
+    async def _create_lookup_indexes(conn):
+        """Index the agent_results -> reviews join column"""
+        # reviews.review_id is already indexed by its UNIQUE constraint
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_agent_results_review_id
+            ON agent_results(review_id);
+        """)
+    
+    @staticmethod
+    async def _add_normalized_embeddings(conn):
+        """
+        Store unit-length embeddings so search can rank by inner product,
+        which equals cosine similarity without recomputing norms per row
+        """
+        await conn.execute("""
+            ALTER TABLE code_patterns
+            ADD COLUMN IF NOT EXISTS embedding_norm halfvec(1536)
+            GENERATED ALWAYS AS (l2_normalize(embedding)) STORED;
+        """)
+        
+        await CodeReviewDB._build_hnsw_index(
+            conn, 'idx_code_patterns_embedding_norm_hnsw', 'embedding_norm', 'halfvec_ip_ops'
+        )
+        
+        # Searches no longer order by cosine distance
+        await conn.execute("DROP INDEX IF EXISTS idx_code_patterns_embedding_hnsw")
+    
+    @staticmethod
+    async def _partition_agent_results(conn):
+        """
+        Rebuild agent_results as a table range-partitioned by month on
+        created_at, with a default partition catching rows for months
+        that have no partition yet
+        """
+        relkind = await conn.fetchval(
+            "SELECT relkind FROM pg_class WHERE oid = 'agent_results'::regclass"
+        )
+        if relkind == 'p':
+            return
+        
+        # Free the names the partitioned table and its indexes will take
+        await conn.execute("ALTER TABLE agent_results RENAME TO agent_results_legacy")
+        await conn.execute("ALTER INDEX agent_results_pkey RENAME TO agent_results_legacy_pkey")
+        await conn.execute("DROP INDEX IF EXISTS idx_agent_results_review_id")
+        
+        # The partition key must be part of the primary key
+        await conn.execute("""
+            CREATE TABLE agent_results (
+                id INTEGER NOT NULL DEFAULT nextval('agent_results_id_seq'),
+                review_id VARCHAR(100) REFERENCES reviews(review_id),
+                agent_type VARCHAR(50) NOT NULL,
+                status VARCHAR(50) DEFAULT 'pending',
+                issues JSONB,
+                summary TEXT,
+                execution_time FLOAT,
+                fork_id VARCHAR(100),
+                error TEXT,
+                created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at);
+        """)
+        
+        await conn.execute("""
+            CREATE TABLE agent_results_default
+            PARTITION OF agent_results DEFAULT;
+        """)
+        
+        await conn.execute("""
+            CREATE INDEX idx_agent_results_review_id
+            ON agent_results(review_id);
+        """)
+        
+        # Creates any missing monthly partition from start_month through
+        # months_ahead months from now. Rows that already landed in the
+        # default partition are moved into the new partition before it is
+        # attached, since attaching fails while default holds them.
+        await conn.execute("""
+            CREATE OR REPLACE FUNCTION ensure_agent_results_partitions(
+                start_month TIMESTAMP,
+                months_ahead INTEGER
+            ) RETURNS VOID LANGUAGE plpgsql AS $$
+            DECLARE
+                month_start TIMESTAMP := date_trunc('month', start_month);
+                last_month TIMESTAMP := date_trunc('month', LOCALTIMESTAMP)
+                    + make_interval(months => months_ahead);
+                month_end TIMESTAMP;
+                partition_name TEXT;
+            BEGIN
+                WHILE month_start <= last_month LOOP
+                    month_end := month_start + INTERVAL '1 month';
+                    partition_name := 'agent_results_' || to_char(month_start, 'YYYY_MM');
+                    
+                    IF to_regclass(partition_name) IS NULL THEN
+                        IF EXISTS (
+                            SELECT 1 FROM agent_results_default
+                            WHERE created_at >= month_start AND created_at < month_end
+                        ) THEN
+                            EXECUTE format(
+                                'CREATE TABLE %I (LIKE agent_results INCLUDING DEFAULTS)',
+                                partition_name
+                            );
+                            EXECUTE format(
+                                'WITH moved AS (
+                                    DELETE FROM agent_results_default
+                                    WHERE created_at >= $1 AND created_at < $2
+                                    RETURNING *
+                                ) INSERT INTO %I SELECT * FROM moved',
+                                partition_name
+                            ) USING month_start, month_end;
+                            EXECUTE format(
+                                'ALTER TABLE agent_results ATTACH PARTITION %I
+                                 FOR VALUES FROM (%L) TO (%L)',
+                                partition_name, month_start, month_end
+                            );
+                        ELSE
+                            EXECUTE format(
+                                'CREATE TABLE %I PARTITION OF agent_results
+                                 FOR VALUES FROM (%L) TO (%L)',
+                                partition_name, month_start, month_end
+                            );
+                        END IF;
+                    END IF;
+                    
+                    month_start := month_end;
+                END LOOP;
+            END;
+            $$;
+        """)
+        
+        # Partitions for every month with existing rows, then copy them over
+        await conn.execute("""
+            SELECT ensure_agent_results_partitions(
+                COALESCE((SELECT MIN(created_at) FROM agent_results_legacy), LOCALTIMESTAMP),
+                $1
+            )
+        """, settings.agent_results_partitions_ahead)
+        
+        await conn.execute("""
+            INSERT INTO agent_results
+            (id, review_id, agent_type, status, issues, summary,
+             execution_time, fork_id, error, created_at)
+            SELECT id, review_id, agent_type, status, issues, summary,
+                execution_time, fork_id, error, COALESCE(created_at, LOCALTIMESTAMP)
+            FROM agent_results_legacy
+        """)
+        
+        # Keep the id sequence alive when the legacy table goes
+        await conn.execute("ALTER SEQUENCE agent_results_id_seq OWNED BY agent_results.id")
+        await conn.execute("DROP TABLE agent_results_legacy")
+    
+    @staticmethod
+    async def _add_review_done_trigger(conn):
+        """NOTIFY review_done with the review_id when a review finishes"""
+        await conn.execute("""
+            CREATE OR REPLACE FUNCTION notify_review_done() RETURNS TRIGGER
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                PERFORM pg_notify('review_done', NEW.review_id);
+                RETURN NULL;
+            END;
+            $$;
+        """)
+        
+        await conn.execute("DROP TRIGGER IF EXISTS reviews_done_notify ON reviews")
+        await conn.execute("""
+            CREATE TRIGGER reviews_done_notify
+            AFTER UPDATE OF status ON reviews
+            FOR EACH ROW
+            WHEN (NEW.status IS DISTINCT FROM OLD.status
+                  AND NEW.status IN ('completed', 'failed'))
+            EXECUTE FUNCTION notify_review_done();
+        """)
+    
+    @staticmethod
+    async def _slim_lookup_indexes(conn):
+        """
+        Drop the INCLUDE indexes earlier versions of step 5 built: the
+        reviews one duplicated the UNIQUE constraint's index, and neither
+        query could use them for index-only scans
+        """
+        await conn.execute("DROP INDEX IF EXISTS idx_reviews_review_id")
+        
+        has_include = await conn.fetchval("""
+            SELECT indnatts > indnkeyatts FROM pg_index
+            WHERE indexrelid = to_regclass('idx_agent_results_review_id')
+        """)
+        if has_include:
+            await conn.execute("DROP INDEX idx_agent_results_review_id")
+            await conn.execute("""
+                CREATE INDEX idx_agent_results_review_id
+                ON agent_results(review_id);
+            """)
+    
+    @staticmethod
+    async def ensure_partitions():
+        """Create upcoming monthly agent_results partitions"""
+        async with db_connection.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", SCHEMA_LOCK_ID)
+                await conn.execute(
+                    ENSURE_PARTITIONS_QUERY, settings.agent_results_partitions_ahead
+                )
+        
+        logger.info("✅ agent_results partitions ready")
+    
     @staticmethod
     async def save_submission(
         code: str, 
         language: str, 
         filename: Optional[str] = None,
         metadata: Optional[Dict] = None,
-        embedding: Optional[List[float]] = None
+        embedding: Optional[np.ndarray] = None
     ) -> int:
         """Save code submission"""
-        query = """
-            INSERT INTO code_submissions 
-            (code, language, filename, metadata, embedding)
-            VALUES ($1, $2, $3, $4, $5)
-            RETURNING id
-        """
-        
         result = await db_connection.execute_one(
-            query,
+            SAVE_SUBMISSION_QUERY,
             code,
             language,
             filename,
-            json.dumps(metadata) if metadata else None,
+            metadata or None,
             embedding
         )
         
         return result['id']
     
+    @staticmethod
+    async def create_submission_and_review(
+        code: str,
+        language: str,
+        review_id: str,
+        filename: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        embedding: Optional[np.ndarray] = None
+    ) -> int:
+        """Save code submission and its review record in one round-trip"""
+        result = await db_connection.execute_one(
+            CREATE_SUBMISSION_AND_REVIEW_QUERY,
+            code,
+            language,
+            filename,
+            metadata or None,
+            embedding,
+            review_id
+        )
+        
+        return result['submission_id']
+    
     @staticmethod
     async def create_review(submission_id: int, review_id: str) -> bool:
         """Create a new review record"""
-        query = """
-            INSERT INTO reviews (submission_id, review_id, status)
-            VALUES ($1, $2, 'running')
-        """
-        
-        await db_connection.execute_write(query, submission_id, review_id)
+        await db_connection.execute_write(
+            CREATE_REVIEW_QUERY, submission_id, review_id
+        )
         return True
     
     @staticmethod
@@ -147,18 +684,12 @@ class CodeReviewDB:
         error: Optional[str] = None
     ):
         """Save agent result"""
-        query = """
-            INSERT INTO agent_results 
-            (review_id, agent_type, status, issues, summary, execution_time, fork_id, error)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-        """
-        
         await db_connection.execute_write(
-            query,
+            SAVE_AGENT_RESULT_QUERY,
             review_id,
             agent_type,
             status,
-            json.dumps(issues),
+            issues,
             summary,
             execution_time,
             fork_id,
@@ -166,90 +697,98 @@ class CodeReviewDB:
         )
     
     @staticmethod
-    async def update_review_status(review_id: str, status: str, total_issues: int):
-        """Update review completion status"""
-        query = """
-            UPDATE reviews 
-            SET status = $1, total_issues = $2, completed_at = NOW()
-            WHERE review_id = $3
+    async def bulk_load_patterns(records: List[Tuple]) -> int:
+        """
+        Load code_patterns rows with binary COPY. Each record is
+        (pattern_name, code_snippet, description, category, language, embedding).
         """
+        await db_connection.copy_records('code_patterns', records, PATTERN_COLUMNS)
+        logger.info(f"✅ Loaded {len(records)} code patterns")
+        return len(records)
+    
+    @staticmethod
+    async def finalize_review(
+        review_id: str,
+        results: List[AgentResult],
+        total_issues: int,
+        status: str = "completed"
+    ):
+        """
+        Save agent results and mark the review done in a single statement:
+        one round-trip, and atomic without an explicit transaction
+        """
+        # One jsonb parameter carries every row; AgentResult fields match
+        # the agent_results columns
+        rows = [result.model_dump(mode="json") for result in results]
         
-        await db_connection.execute_write(query, status, total_issues, review_id)
+        await db_connection.execute_write(
+            FINALIZE_REVIEW_QUERY, review_id, rows, status, total_issues
+        )
+    
+    @staticmethod
+    async def update_review_status(review_id: str, status: str, total_issues: int):
+        """Update review completion status"""
+        await db_connection.execute_write(
+            UPDATE_REVIEW_STATUS_QUERY, status, total_issues, review_id
+        )
     
     @staticmethod
     async def get_review(review_id: str) -> Optional[Dict]:
         """Get review with all agent results"""
-        query = """
-            SELECT 
-                r.*,
-                cs.code, cs.language, cs.filename,
-                COALESCE(
-                    json_agg(
-                        json_build_object(
-                            'agent_type', ar.agent_type,
-                            'status', ar.status,
-                            'issues', ar.issues,
-                            'summary', ar.summary,
-                            'execution_time', ar.execution_time,
-                            'fork_id', ar.fork_id
-                        )
-                    ) FILTER (WHERE ar.id IS NOT NULL),
-                    '[]'
-                ) as agent_results
-            FROM reviews r
-            JOIN code_submissions cs ON r.submission_id = cs.id
-            LEFT JOIN agent_results ar ON r.review_id = ar.review_id
-            WHERE r.review_id = $1
-            GROUP BY r.id, cs.id
-        """
+        # Plain join grouped here instead of GROUP BY + json_agg on the server
+        rows = await db_connection.execute_query(GET_REVIEW_QUERY, review_id)
+        
+        if not rows:
+            return None
         
-        result = await db_connection.execute_one(query, review_id)
-        return dict(result) if result else None
+        agent_columns = set(_REVIEW_AGENT_COLUMNS.values())
+        review = {k: v for k, v in rows[0].items() if k not in agent_columns}
+        review['agent_results'] = [
+            {field: row[column] for field, column in _REVIEW_AGENT_COLUMNS.items()}
+            for row in rows
+            if row['agent_type'] is not None
+        ]
+        
+        return review
+    
+    @staticmethod
+    async def get_review_status(review_id: str) -> Optional[str]:
+        """Get just the review status, or None if the review doesn't exist"""
+        result = await db_connection.execute_one(GET_REVIEW_STATUS_QUERY, review_id)
+        return result['status'] if result else None
+    
+    @staticmethod
+    async def iter_agent_results(review_id: str, prefetch: int = 50) -> AsyncIterator[Dict]:
+        """Stream a review's agent results through a server-side cursor"""
+        async with db_connection.acquire() as conn:
+            # Cursors only live inside a transaction
+            async with conn.transaction():
+                async for row in conn.cursor(
+                    GET_AGENT_RESULTS_QUERY, review_id, prefetch=prefetch
+                ):
+                    yield dict(row)
+    
+    @staticmethod
+    async def get_stats() -> Dict:
+        """Get aggregate review statistics"""
+        result = await db_connection.execute_one(STATS_QUERY)
+        return dict(result)
     
     @staticmethod
     async def hybrid_search(
         query_text: str, 
-        embedding: Optional[List[float]] = None,
+        embedding: Optional[np.ndarray] = None,
         limit: int = 5
     ) -> List[Dict]:
         """
-        Hybrid search using BM25 (via pg_textsearch when available) 
-        and vector similarity
+        Hybrid search: full-text (GIN) and vector similarity (HNSW)
+        fused with Reciprocal Rank Fusion in a single query.
+        Without an embedding only the text ranking contributes.
         """
-        
-        # For now, use vector search if embedding provided
-        if embedding:
-            query = """
-                SELECT 
-                    code_snippet,
-                    pattern_name,
-                    description,
-                    1 - (embedding <=> $1::vector) as similarity
-                FROM code_patterns
-                ORDER BY embedding <=> $1::vector
-                LIMIT $2
-            """
-            
-            results = await db_connection.execute_query(query, embedding, limit)
-            return [dict(r) for r in results]
-        
-        # Fallback to text search
-        query = """
-            SELECT 
-                code_snippet,
-                pattern_name,
-                description,
-                0.5 as similarity
-            FROM code_patterns
-            WHERE code_snippet ILIKE $1
-            LIMIT $2
-        """
-        
         results = await db_connection.execute_query(
-            query, 
-            f"%{query_text}%", 
-            limit
+            HYBRID_SEARCH_QUERY, _normalize(embedding), query_text, limit
         )
+        
         return [dict(r) for r in results]
 
 
@@ -12,7 +12,9 @@ os.environ['TIGER_DB_NAME'] = 'demo'
 os.environ['TIGER_DB_USER'] = 'demo'
 os.environ['TIGER_DB_PASSWORD'] = 'demo'
 
-from app.agents import SecurityAgent, PerformanceAgent, QualityAgent
+from app.agents import build_agent
+from app.agents import clients
+from app.models import AgentType
 
 # Sample code to review
 SAMPLE_CODE = """
@@ -32,6 +34,15 @@ def process_file(filename):
     return data
 """
 
+# Per-agent limit so one stuck LLM call can't hang the demo
+AGENT_TIMEOUT = 30
+
+
+async def analyze_with_timeout(agent, code: str, language: str):
+    """Run one agent analysis under AGENT_TIMEOUT"""
+    async with asyncio.timeout(AGENT_TIMEOUT):
+        return await agent.analyze_code(code, language)
+
 async def run_demo():
     print("=" * 80)
     print("🚀 AI CODE REVIEW SWARM - DEMO MODE")
@@ -46,9 +57,9 @@ async def run_demo():
     print()
     
     # Initialize agents
-    security = SecurityAgent()
-    performance = PerformanceAgent()
-    quality = QualityAgent()
+    security = build_agent(AgentType.SECURITY)
+    performance = build_agent(AgentType.PERFORMANCE)
+    quality = build_agent(AgentType.QUALITY)
     
     print("✅ Security Agent: Ready")
     print("✅ Performance Agent: Ready")
@@ -56,11 +67,11 @@ async def run_demo():
     print()
     
     # Check AI status
-    if security.gemini_model:
+    if clients.gemini_model:
         print("🧠 AI Model: Gemini Pro (ACTIVE)")
-    elif security.openai_client:
+    elif clients.openai_client:
         print("🧠 AI Model: OpenAI GPT-4")
-    elif security.anthropic_client:
+    elif clients.anthropic_client:
         print("🧠 AI Model: Anthropic Claude")
     else:
         print("⚠️  No AI model configured - please add API keys to .env")
@@ -71,13 +82,13 @@ async def run_demo():
     print("=" * 80)
     print()
     
-    # Run agents in parallel
-    results = await asyncio.gather(
-        security.analyze_code(SAMPLE_CODE, "python"),
-        performance.analyze_code(SAMPLE_CODE, "python"),
-        quality.analyze_code(SAMPLE_CODE, "python"),
-        return_exceptions=True
-    )
+    # Run agents in parallel; a failure cancels the remaining agents
+    async with asyncio.TaskGroup() as tg:
+        tasks = [
+            tg.create_task(analyze_with_timeout(agent, SAMPLE_CODE, "python"))
+            for agent in (security, performance, quality)
+        ]
+    results = [task.result() for task in tasks]
     
     # Display results
     agent_names = ["🔒 SECURITY AGENT", "⚡ PERFORMANCE AGENT", "✨ QUALITY AGENT"]
@@ -86,10 +97,6 @@ async def run_demo():
         print(f"\n{name}")
         print("=" * 80)
         
-        if isinstance(result, Exception):
-            print(f"❌ Error: {result}")
-            continue
-        
         print(f"⏱️  Execution Time: {result.execution_time:.2f}s")
         print(f"📊 Status: {result.status.value}")
         print(f"🔍 Issues Found: {len(result.issues)}")
@@ -3,26 +3,31 @@
 Test script for AI Code Review Swarm API
 """
 
-import requests
-import json
-import time
-from typing import Dict, Any
+import asyncio
+import httpx
+import orjson
+from typing import Dict, Any, Optional
 
 BASE_URL = "http://localhost:8000"
 
+# Server-side long-poll per request (stays under the client timeout),
+# and overall limit per review
+WAIT_TIMEOUT = 25.0
+REVIEW_TIMEOUT = 120.0
+
 
 def print_result(title: str, data: Any):
     """Pretty print results"""
     print(f"\n{'='*60}")
     print(f"  {title}")
     print('='*60)
-    print(json.dumps(data, indent=2))
+    print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
 
 
-def test_health():
+async def test_health(client: httpx.AsyncClient):
     """Test health endpoint"""
     print("\n🏥 Testing Health Check...")
-    response = requests.get(f"{BASE_URL}/health")
+    response = await client.get("/health")
     
     if response.status_code == 200:
         print("✅ Health check passed!")
@@ -33,7 +38,11 @@ def test_health():
         return False
 
 
-def test_review(code: str, language: str = "python") -> str:
+async def test_review(
+    client: httpx.AsyncClient,
+    code: str,
+    language: str = "python"
+) -> Optional[str]:
     """Submit code for review"""
     print(f"\n🔍 Submitting code review...")
     
@@ -47,11 +56,7 @@ def test_review(code: str, language: str = "python") -> str:
         "use_hybrid_search": True
     }
     
-    response = requests.post(
-        f"{BASE_URL}/review",
-        json=payload,
-        headers={"Content-Type": "application/json"}
-    )
+    response = await client.post("/review", json=payload)
     
     if response.status_code == 200:
         data = response.json()
@@ -65,15 +70,28 @@ def test_review(code: str, language: str = "python") -> str:
         return None
 
 
-def get_review_status(review_id: str, wait: bool = True) -> Dict:
-    """Get review results"""
-    print(f"\n📊 Getting review results for {review_id}...")
+async def wait_for_review(client: httpx.AsyncClient, review_id: str) -> httpx.Response:
+    """Long-poll the review until it leaves the running state"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + REVIEW_TIMEOUT
     
-    if wait:
-        print("⏳ Waiting for agents to complete (15 seconds)...")
-        time.sleep(15)
+    while True:
+        # Returns as soon as the server is notified the review finished
+        response = await client.get(
+            f"/review/{review_id}/wait",
+            params={"timeout": WAIT_TIMEOUT}
+        )
+        if response.status_code != 200 or response.json().get("status") != "running":
+            return response
+        if loop.time() >= deadline:
+            return response
+
+
+async def get_review_status(client: httpx.AsyncClient, review_id: str) -> Optional[Dict]:
+    """Get review results"""
+    print(f"\n📊 Waiting for review results for {review_id}...")
     
-    response = requests.get(f"{BASE_URL}/review/{review_id}")
+    response = await wait_for_review(client, review_id)
     
     if response.status_code == 200:
         data = response.json()
@@ -112,11 +130,11 @@ def get_review_status(review_id: str, wait: bool = True) -> Dict:
         return None
 
 
-def test_stats():
+async def test_stats(client: httpx.AsyncClient):
     """Get system statistics"""
     print("\n📈 Getting system statistics...")
     
-    response = requests.get(f"{BASE_URL}/stats")
+    response = await client.get("/stats")
     
     if response.status_code == 200:
         print("✅ Stats retrieved!")
@@ -166,36 +184,47 @@ def x(a, b, c):
 }
 
 
-def main():
+async def run_case(client: httpx.AsyncClient, name: str, test_case: Dict) -> Optional[Dict]:
+    """Submit one test case and wait for its review"""
+    print(f"\n🚀 Testing: {name.upper()}")
+    
+    review_id = await test_review(
+        client,
+        code=test_case["code"],
+        language=test_case["language"]
+    )
+    
+    if review_id:
+        return await get_review_status(client, review_id)
+    return None
+
+
+async def main():
     """Run all tests"""
     print("\n" + "="*60)
     print("  🐅 AI Code Review Swarm - API Test Suite")
     print("="*60)
     
-    # Test health
-    if not test_health():
-        print("\n❌ Server not healthy. Exiting.")
-        return
-    
-    # Test each case
-    for name, test_case in TEST_CASES.items():
-        print(f"\n\n{'#'*60}")
-        print(f"  Testing: {name.upper()}")
-        print('#'*60)
-        
-        review_id = test_review(
-            code=test_case["code"],
-            language=test_case["language"]
-        )
+    # Shared client reuses keep-alive connections across every request
+    # below (plain http:// and uvicorn mean HTTP/1.1, not HTTP/2)
+    async with httpx.AsyncClient(
+        base_url=BASE_URL,
+        limits=httpx.Limits(max_keepalive_connections=10),
+        timeout=30.0
+    ) as client:
+        # Test health
+        if not await test_health(client):
+            print("\n❌ Server not healthy. Exiting.")
+            return
         
-        if review_id:
-            get_review_status(review_id, wait=True)
+        # Submit all cases at once; total time is the slowest review
+        await asyncio.gather(*[
+            run_case(client, name, test_case)
+            for name, test_case in TEST_CASES.items()
+        ])
         
-        # Small delay between tests
-        time.sleep(2)
-    
-    # Get final stats
-    test_stats()
+        # Get final stats
+        await test_stats(client)
     
     print("\n\n" + "="*60)
     print("  ✅ All tests completed!")
@@ -204,10 +233,10 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
+        asyncio.run(main())
     except KeyboardInterrupt:
         print("\n\n⚠️  Tests interrupted by user")
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print("\n❌ Cannot connect to server. Is it running?")
         print("   Start with: python app/main.py")
     except Exception as e: